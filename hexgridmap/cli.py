@@ -0,0 +1,365 @@
+"""Command line interface for building hexgrid maps from many shapefiles.
+
+Usage:
+
+    hexgridmap [OPTIONS] SHAPEFILE [SHAPEFILE ...]
+
+Each shapefile (or glob pattern) is processed in its own worker process, and
+the resulting hexgrid is written out as geoJSON to the output directory.
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from joblib import Memory
+from .geo import io, operations, simplify
+from .hexagons import hexgrid
+
+
+class CodeExtractor(object):
+
+    """Pull the unique code for a polygon out of one of its properties.
+
+    A class rather than a closure so that it can be sent to worker processes
+    and hashed by the joblib cache.
+    """
+
+    def __init__(self, field):
+        """
+        Args:
+            field (str): name of the property containing the code.
+        """
+        self.field = field
+
+    def __call__(self, x):
+        return x['properties'][self.field]
+
+
+def simplifypolygons(path, mtime, tolerance):
+    """Load the shapefile and simplify the polygons.
+
+    Cached alongside the neighbours. The modification time is part of the
+    arguments so that the cache is invalidated when the shapefile changes.
+
+    Args:
+        path (str): path of the shapefile
+        mtime (float): modification time of the shapefile
+        tolerance (float): simplification tolerance in map units
+
+    Returns: (list): simplified polygons
+
+    """
+    return simplify.simplify(io.loadshapefile(path), tolerance)
+
+
+def findneighbours(path, mtime, tolerance, codeextractor, polys):
+    """Find the neighbours of each polygon.
+
+    This is the slow part of the preprocessing, so it gets cached. The
+    polygons themselves are left out of the cache key, they are identified
+    by the path, modification time and simplification tolerance instead.
+
+    Args:
+        path (str): path of the shapefile
+        mtime (float): modification time of the shapefile
+        tolerance (float): simplification tolerance applied to polys, or None
+        codeextractor (CodeExtractor): extracts the code from each polygon
+        polys (list): the polygons loaded from path
+
+    Returns: (dict): {code: [neighbours]}
+
+    """
+    return operations.findneighbours(polys, codeextractor)
+
+
+def processfile(path, outputpath, options):
+    """Build the hexgrid for a single shapefile and write it out.
+
+    Args:
+        path (str): path of the shapefile
+        outputpath (str): path of the geoJSON file to write
+        options (argparse.Namespace): parsed command line options
+
+    Returns: (dict): the output path and the time spent in each stage.
+
+    """
+    timings = {}
+    start = time.time()
+
+    codeextractor = CodeExtractor(options.code_field)
+    # positional so that it works with old and new versions of joblib
+    mem = Memory(options.cache_dir, verbose=0)
+    abspath = os.path.abspath(path)
+    mtime = os.path.getmtime(path)
+
+    # the extent comes from the bounds stored in the file, so use the
+    # original polygons for that.
+    collection = io.loadshapefile(path)
+    if options.simplify is None:
+        polys = collection
+    else:
+        polys = mem.cache(simplifypolygons)(abspath, mtime, options.simplify)
+    timings['load'] = time.time() - start
+
+    stage = time.time()
+    neighbours = mem.cache(findneighbours, ignore=['polys'])(
+        abspath, mtime, options.simplify, codeextractor, polys
+    )
+    timings['neighbours'] = time.time() - stage
+
+    stage = time.time()
+    columns = operations.extractcentroids(
+        polys, codeextractor, options.fields,
+        representative=options.representative_point,
+        processes=options.extract_workers
+    )
+    position = 'representative_point' if options.representative_point \
+        else 'centroid'
+    objects = operations.columnstoobjects(columns, position)
+    extent = operations.findextent(collection, trim=options.trim)
+    timings['extract'] = time.time() - stage
+
+    stage = time.time()
+    h = hexgrid.Hexgrid(objects, extent, neighbours, n_x=options.n_x,
+                        n_y=options.n_y, padding=options.padding,
+                        schedule=options.schedule, seed=options.seed)
+    h.fit(verbose=options.verbose)
+    timings['fit'] = time.time() - stage
+
+    stage = time.time()
+    io.to_geojson(h, outputpath)
+    timings['write'] = time.time() - stage
+
+    timings['total'] = time.time() - start
+    return {'output': outputpath, 'timings': timings}
+
+
+def expandinputs(inputs):
+    """Expand any glob patterns in the list of inputs.
+
+    Args:
+        inputs (list): paths or glob patterns of shapefiles
+
+    Returns: (list): sorted, deduplicated paths of shapefiles
+
+    """
+    paths = set()
+    for i in inputs:
+        matches = glob.glob(i)
+        if not matches and not glob.has_magic(i):
+            # let the missing file be reported when it gets processed.
+            matches = [i]
+        paths.update(matches)
+    return sorted(paths)
+
+
+def outputpaths(paths, outputdir):
+    """Work out where to write the output for each shapefile.
+
+    Args:
+        paths (list): paths of the shapefiles
+        outputdir (str): directory to write the outputs to
+
+    Returns: (dict): {path: output path}
+
+    Raises:
+        ValueError: if two shapefiles would be written to the same output.
+
+    """
+    output = {}
+    clashes = {}
+    for path in paths:
+        name = os.path.splitext(os.path.basename(path))[0]
+        outputpath = os.path.join(outputdir, name + '.json')
+        clashes.setdefault(outputpath, []).append(path)
+        output[path] = outputpath
+
+    clashes = {k: v for k, v in clashes.items() if len(v) > 1}
+    if clashes:
+        raise ValueError(
+            "Shapefiles would overwrite each other's output: {}".format(
+                '; '.join(
+                    '{} -> {}'.format(', '.join(v), k)
+                    for k, v in sorted(clashes.items())
+                )
+            )
+        )
+    return output
+
+
+def parsemapping(values, converter=str):
+    """Parse a list of KEY=VALUE strings into a dictionary.
+
+    Args:
+        values (list): strings of the form KEY=VALUE
+        converter (function): applied to each value
+
+    Returns: (dict): {key: converted value}
+
+    """
+    output = {}
+    for v in values:
+        key, sep, value = v.partition('=')
+        if not sep:
+            raise argparse.ArgumentTypeError(
+                "Expected KEY=VALUE, got {}".format(v)
+            )
+        output[key] = converter(value)
+    return output
+
+
+def parseargs(argv=None):
+    """Parse the command line options.
+
+    Args:
+        argv (list): command line arguments, defaults to sys.argv
+
+    Returns: (argparse.Namespace): parsed options
+
+    """
+    parser = argparse.ArgumentParser(
+        description="Create equal area hexagon grids from shapefiles."
+    )
+    parser.add_argument('inputs', nargs='+',
+                        help="shapefiles to process, glob patterns allowed")
+    parser.add_argument('-o', '--output-dir', default='.',
+                        help="directory to write the geoJSON outputs to")
+    parser.add_argument('--code-field', default='lau118cd',
+                        help="property holding the unique code")
+    parser.add_argument('--field', action='append', default=[],
+                        metavar='NAME=PROPERTY',
+                        help="copy PROPERTY into the output as NAME, can be "
+                             "repeated. Defaults to the LAU 2018 schema")
+    size = parser.add_mutually_exclusive_group()
+    size.add_argument('--n-x', type=int, default=None,
+                      help="number of hexagons in the x axis, must be even")
+    size.add_argument('--n-y', type=int, default=None,
+                      help="number of hexagons in the y axis")
+    parser.add_argument('--padding', action='append', default=[],
+                        metavar='COMPONENT=VALUE',
+                        help="adjust the extent, e.g. max_x=50e3, can be "
+                             "repeated. Defaults to max_x=50e3")
+    parser.add_argument('--trim', type=float, default=None,
+                        metavar='PERCENT',
+                        help="trim the extent to these percentiles of the "
+                             "polygon bounds, to ignore outlying islands. "
+                             "Between 0 and 50")
+    parser.add_argument('--simplify', type=float, default=None,
+                        metavar='TOLERANCE',
+                        help="simplify the polygons to this tolerance in map "
+                             "units first, keeping shared borders identical")
+    parser.add_argument('--representative-point', action='store_true',
+                        help="place polygons by a point guaranteed to be "
+                             "inside them rather than their centroid")
+    parser.add_argument('--schedule', choices=['random', 'priority'],
+                        default='random',
+                        help="how to pick the next overlap to fix. "
+                             "'priority' fixes the cheapest ones first, "
+                             "and always gives the same result")
+    parser.add_argument('--seed', type=int, default=None,
+                        help="seed for the random numbers used by the "
+                             "'random' schedule, so that runs can be "
+                             "reproduced")
+    parser.add_argument('--cache-dir', default='/tmp/joblib',
+                        help="directory for the preprocessing cache")
+    parser.add_argument('-v', '--verbose', action='store_true',
+                        help="print the progress of each fit")
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help="number of worker processes, defaults to the "
+                             "number of CPUs")
+
+    options = parser.parse_args(argv)
+    try:
+        options.fields = parsemapping(options.field) or {
+            'name': 'lau118nm',
+            'e': 'bng_e',
+            'n': 'bng_n',
+        }
+        options.padding = parsemapping(options.padding, float) or {
+            'max_x': 50e3,
+        }
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+
+    if options.trim is not None and not 0 <= options.trim < 50:
+        parser.error("--trim needs to be at least 0 and less than 50")
+
+    if options.n_x is None and options.n_y is None:
+        options.n_x = 36
+
+    # main() shares the workers between files when there is more than one.
+    options.extract_workers = options.workers
+
+    return options
+
+
+def main(argv=None):
+    """Process all the shapefiles in a process pool and summarise timings.
+    """
+    options = parseargs(argv)
+    paths = expandinputs(options.inputs)
+    if not paths:
+        print("No shapefiles matched {}".format(' '.join(options.inputs)))
+        return 1
+
+    try:
+        outputs = outputpaths(paths, options.output_dir)
+    except ValueError as e:
+        print(e)
+        return 1
+
+    if not os.path.isdir(options.output_dir):
+        os.makedirs(options.output_dir)
+
+    results = {}
+    failures = {}
+    if len(paths) == 1:
+        # nothing to share between files, so spread the centroid
+        # extraction over the workers instead.
+        options.extract_workers = options.workers
+        try:
+            results[paths[0]] = processfile(paths[0], outputs[paths[0]],
+                                            options)
+        except Exception as e:
+            failures[paths[0]] = e
+    else:
+        # the files are already spread over the workers, don't start a
+        # pool inside each of them.
+        options.extract_workers = 1
+        with ProcessPoolExecutor(max_workers=options.workers) as executor:
+            futures = {
+                executor.submit(processfile, path, outputs[path],
+                                options): path
+                for path in paths
+            }
+            for future in as_completed(futures):
+                path = futures[future]
+                try:
+                    results[path] = future.result()
+                except Exception as e:
+                    failures[path] = e
+
+    stages = ['load', 'neighbours', 'extract', 'fit', 'write', 'total']
+    print('\t'.join(['file'] + stages))
+    for path in sorted(results):
+        timings = results[path]['timings']
+        print('\t'.join(
+            [path] + ['{:.1f}'.format(timings[s]) for s in stages]
+        ))
+    for path in sorted(failures):
+        e = failures[path]
+        # the traceback from the worker process is chained on as the cause
+        print('{}\tfailed: {}: {}\n{}'.format(
+            path, type(e).__name__, e,
+            ''.join(traceback.format_exception(type(e), e, e.__traceback__))
+        ))
+
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
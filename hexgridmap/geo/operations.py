@@ -1,10 +1,12 @@
 """Functions that perform operations on the polygon objects."""
 
 from shapely.geometry import shape
+import fiona
 import math
+import multiprocessing
 import itertools
 from collections import defaultdict
-from numpy import array
+from numpy import array, percentile
 import tqdm
 
 
@@ -64,22 +66,257 @@ def extractobjects(polys, codeextractor, objectextractor):
     return output
 
 
-def findextent(polys):
+def _extractrows(features, codeextractor, fields, representative):
+    """Extract the code, attributes and centroid of each feature.
+
+    Args:
+        features (iterable): features like those read by fiona
+        codeextractor (function): extracts the code from each feature
+        fields (dict): {column name: name of the property to copy}
+        representative (bool): also calculate representative points
+
+    Returns: (list): [(code, [attributes], centroid, representative point
+        or None)]
+
+    """
+    output = []
+    for p in features:
+        s = shape(p['geometry'])
+        centroid = s.centroid
+        point = None
+        if representative:
+            point = s.representative_point()
+            point = (point.x, point.y)
+        output.append((
+            codeextractor(p),
+            [p['properties'][v] for v in fields.values()],
+            (centroid.x, centroid.y),
+            point
+        ))
+    return output
+
+
+def _extractrange(job):
+    """Read a range of features from a file and extract them.
+
+    Module level so that it can be sent to worker processes. The worker opens
+    the file itself, so only the indexes have to be sent to it rather than
+    the geometries.
+
+    Args:
+        job (tuple): (path of the file, first index, index to stop at, then
+            the arguments to _extractrows)
+
+    Returns: (list): as _extractrows
+
+    """
+    path, start, stop, codeextractor, fields, representative = job
+    with fiona.open(path) as polys:
+        features = (f for _, f in polys.items(start, stop))
+        return _extractrows(features, codeextractor, fields, representative)
+
+
+def _extractchunk(job):
+    """Extract a chunk of features held in memory.
+
+    Module level so that it can be sent to worker processes.
+
+    Args:
+        job (tuple): the arguments to _extractrows
+
+    Returns: (list): as _extractrows
+
+    """
+    return _extractrows(*job)
+
+
+def extractcentroids(polys, codeextractor, fields=None, representative=False,
+                     processes=None, chunksize=64):
+    """Extract the centroids and attributes of the polygons in bulk.
+
+    The work is split into chunks and shared between a pool of worker
+    processes. If polys is a fiona collection then each worker reads its
+    chunk from the file, so the geometries don't have to be sent to it.
+
+    :polys: fiona.collection.Collection or list of polygons
+    :codeextractor: function applied to each element in polys. Extracts a
+        unique code from that element. Needs to be picklable when using more
+        than one process.
+    :fields: {column name: name of the property to copy}
+    :representative: also calculate a representative point for each polygon,
+        which is guaranteed to be inside the polygon unlike the centroid.
+    :processes: number of worker processes. Defaults to the number of CPUs,
+        1 does the work in this process.
+    :chunksize: number of polygons given to a worker at a time
+    :returns: {column name: column}. The 'code' column holds the codes, the
+        'centroid' and 'representative_point' columns are n x 2 arrays, and
+        there is a list for each of the fields. Rows are in the same order in
+        every column.
+
+    """
+    fields = fields or {}
+    path = getattr(polys, 'path', None)
+    if not hasattr(polys, '__len__'):
+        polys = list(polys)
+
+    if processes == 1 or len(polys) <= chunksize:
+        rows = _extractrows(polys, codeextractor, fields, representative)
+    else:
+        if path is not None:
+            worker = _extractrange
+            jobs = [
+                (path, i, min(i + chunksize, len(polys)), codeextractor,
+                 fields, representative)
+                for i in range(0, len(polys), chunksize)
+            ]
+        else:
+            worker = _extractchunk
+            polys = list(polys)
+            jobs = [
+                (polys[i:i + chunksize], codeextractor, fields,
+                 representative)
+                for i in range(0, len(polys), chunksize)
+            ]
+        with multiprocessing.Pool(processes) as pool:
+            rows = list(itertools.chain.from_iterable(
+                pool.map(worker, jobs)
+            ))
+
+    columns = {'code': [r[0] for r in rows]}
+    for i, k in enumerate(fields):
+        columns[k] = [r[1][i] for r in rows]
+    columns['centroid'] = array(
+        [r[2] for r in rows], dtype=float
+    ).reshape(-1, 2)
+    if representative:
+        columns['representative_point'] = array(
+            [r[3] for r in rows], dtype=float
+        ).reshape(-1, 2)
+    return columns
+
+
+def columnstoobjects(columns, position='centroid'):
+    """Convert the columns from extractcentroids into objects for a Hexgrid.
+
+    :columns: {column name: column} as returned by extractcentroids
+    :position: the column to use as the position of each object on the grid,
+        either 'centroid' or 'representative_point'
+    :returns: {code: {interesting parts}}
+
+    """
+    if position not in columns:
+        raise ValueError(
+            "No {} column, for representative points call extractcentroids "
+            "with representative=True.".format(position)
+        )
+
+    points = {'centroid', 'representative_point'}
+    attributes = [k for k in columns if k != 'code' and k not in points]
+    output = {}
+    for i, code in enumerate(columns['code']):
+        obj = {k: columns[k][i] for k in attributes}
+        obj['centroid'] = tuple(columns[position][i].tolist())
+        output[code] = obj
+    return output
+
+
+def iterrings(coordinates):
+    """Walk through nested geoJSON coordinates, yielding each ring.
+
+    Args:
+        coordinates (list): coordinates member of a geoJSON geometry
+
+    Yields: (numpy.ndarray): n x 2 array of the points making up a ring or
+        line. A single point is yielded as a 1 x 2 array.
+
+    """
+    if len(coordinates) == 0:
+        return
+    first = coordinates[0]
+    if isinstance(first, (int, float)):
+        # it's a single point
+        yield array([coordinates[:2]], dtype=float)
+    elif isinstance(first[0], (int, float)):
+        # it's a list of points, drop any z coordinate
+        yield array([c[:2] for c in coordinates], dtype=float)
+    else:
+        for c in coordinates:
+            for ring in iterrings(c):
+                yield ring
+
+
+def geometrybounds(geometry):
+    """Find the bounding box of a geoJSON geometry without parsing it into a
+    shapely object.
+
+    Args:
+        geometry (dict): geoJSON-like geometry, as read by fiona
+
+    Returns: (tuple): min_x, min_y, max_x, max_y
+
+    """
+    if geometry['type'] == 'GeometryCollection':
+        bounds = array([geometrybounds(g) for g in geometry['geometries']])
+        return (bounds[:, 0].min(), bounds[:, 1].min(),
+                bounds[:, 2].max(), bounds[:, 3].max())
+
+    min_x = min_y = math.inf
+    max_x = max_y = -math.inf
+    for ring in iterrings(geometry['coordinates']):
+        lower = ring.min(axis=0)
+        upper = ring.max(axis=0)
+        min_x = min(min_x, lower[0])
+        min_y = min(min_y, lower[1])
+        max_x = max(max_x, upper[0])
+        max_y = max(max_y, upper[1])
+    return (min_x, min_y, max_x, max_y)
+
+
+def findextent(polys, trim=None):
     """Finds the maximum and minimum coordinates in the polygons.
 
-    :polys: list of polygons
+    If polys is a fiona collection then the bounds stored in the file are
+    used, otherwise the coordinates of each polygon are scanned.
+
+    :polys: fiona.collection.Collection or list of polygons
+    :trim: optional percentage. If set then the extent is the trim and
+        100 - trim percentiles of the polygon bounding boxes, so that a few
+        outlying islands don't stretch the grid.
     :returns: object containing extents
 
     """
-    bboxes = []
-    for p in polys:
-        s = shape(p['geometry'])
-        bboxes.append(s.bounds)
+    if trim is not None and not 0 <= trim < 50:
+        raise ValueError("trim needs to be at least 0 and less than 50.")
+
+    bounds = getattr(polys, 'bounds', None)
+    if trim is None and bounds is not None:
+        return {
+            'min_x': bounds[0],
+            'min_y': bounds[1],
+            'max_x': bounds[2],
+            'max_y': bounds[3],
+        }
+
+    if trim is None:
+        min_x = min_y = math.inf
+        max_x = max_y = -math.inf
+        for p in polys:
+            b = geometrybounds(p['geometry'])
+            min_x = min(min_x, b[0])
+            min_y = min(min_y, b[1])
+            max_x = max(max_x, b[2])
+            max_y = max(max_y, b[3])
+        return {
+            'min_x': min_x,
+            'min_y': min_y,
+            'max_x': max_x,
+            'max_y': max_y,
+        }
 
-    bboxes = array(bboxes)
+    bboxes = array([geometrybounds(p['geometry']) for p in polys])
     return {
-        'min_x': min(bboxes.min(axis=0)[[0, 2]]),
-        'min_y': min(bboxes.min(axis=0)[[1, 3]]),
-        'max_x': max(bboxes.max(axis=0)[[0, 2]]),
-        'max_y': max(bboxes.max(axis=0)[[1, 3]]),
+        'min_x': percentile(bboxes[:, 0], trim),
+        'min_y': percentile(bboxes[:, 1], trim),
+        'max_x': percentile(bboxes[:, 2], 100 - trim),
+        'max_y': percentile(bboxes[:, 3], 100 - trim),
     }
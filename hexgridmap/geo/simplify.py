@@ -0,0 +1,327 @@
+"""Simplify polygons while keeping shared borders identical.
+
+Simplifying each polygon on its own would simplify the two sides of a shared
+border differently, so neighbouring polygons would no longer touch. Instead
+each ring is split into arcs at the points where the set of polygons that
+share a vertex changes. An arc shared by two polygons is then simplified once
+and the same result used for both, so adjacency is preserved.
+
+Simplifying the arcs separately can still make one arc cross another, so any
+arcs that cross are simplified again with a smaller tolerance until they
+don't. If a polygon still comes out invalid then its original arcs are used.
+"""
+
+from collections import defaultdict
+import numpy as np
+from shapely.geometry import LineString, shape
+
+
+def douglaspeucker(points, tolerance):
+    """Simplify a line with the Douglas-Peucker algorithm. The end points
+    are always kept.
+
+    Args:
+        points (numpy.ndarray): n x 2 array of points along the line
+        tolerance (float): maximum distance a removed point can be from the
+            simplified line, in map units
+
+    Returns: (numpy.ndarray): boolean mask of the points to keep
+
+    """
+    keep = np.zeros(len(points), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        start = points[first]
+        direction = points[last] - start
+        offsets = points[first + 1:last] - start
+        length = np.hypot(direction[0], direction[1])
+        if length == 0:
+            # closed line, use the distance from the start point
+            distances = np.hypot(offsets[:, 0], offsets[:, 1])
+        else:
+            distances = np.abs(
+                direction[0] * offsets[:, 1] - direction[1] * offsets[:, 0]
+            ) / length
+        i = np.argmax(distances)
+        if distances[i] > tolerance:
+            split = first + 1 + i
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+    return keep
+
+
+def canonicalarc(arc):
+    """Pick the direction to walk an arc in, so that it is the same whichever
+    polygon it came from.
+
+    Args:
+        arc (list): tuples of the coordinates along the arc
+
+    Returns: (tuple, bool): the arc in its canonical direction, and whether
+        that is the reverse of the direction given.
+
+    """
+    reverse = arc[-1] < arc[0] or (arc[-1] == arc[0] and arc[-2] < arc[1])
+    key = tuple(reversed(arc)) if reverse else tuple(arc)
+    return key, reverse
+
+
+def splitring(ring, owners):
+    """Split a ring into arcs.
+
+    Args:
+        ring (list): tuples of coordinates, first and last are the same
+        owners (dict): {coordinate: set of polygons with that vertex}
+
+    Returns: (list): [(arc in its canonical direction, whether it is reversed
+        in this ring)]
+
+    """
+    points = ring[:-1]
+    n = len(points)
+
+    # break the ring wherever the polygons sharing the vertices change
+    breaks = [
+        i for i in range(n)
+        if owners[points[i]] != owners[points[i - 1]]
+        or owners[points[i]] != owners[points[(i + 1) % n]]
+    ]
+
+    if not breaks:
+        # the whole ring is one arc. Start it at the smallest vertex so that
+        # an enclave and the hole it fills give the same arc.
+        start = points.index(min(points))
+        rotated = points[start:] + points[:start]
+        return [canonicalarc(rotated + [rotated[0]])]
+
+    arcs = []
+    for b, start in enumerate(breaks):
+        end = breaks[(b + 1) % len(breaks)]
+        if end <= start:
+            end += n
+        arc = [points[i % n] for i in range(start, end + 1)]
+        arcs.append(canonicalarc(arc))
+    return arcs
+
+
+def joinarcs(arcs, simplified):
+    """Join the arcs of a ring back together.
+
+    Args:
+        arcs (list): as returned by splitring
+        simplified (dict): {arc: simplified arc}
+
+    Returns: (list): tuples of the ring coordinates
+
+    """
+    output = []
+    for key, reverse in arcs:
+        arc = simplified[key]
+        if reverse:
+            arc = list(reversed(arc))
+        output.extend(arc[:-1])
+    output.append(output[0])
+    return output
+
+
+def _clashes(a, b):
+    """Do two simplified arcs meet anywhere except their shared ends?
+    """
+    line_a = LineString(a)
+    line_b = LineString(b)
+    if not line_a.intersects(line_b):
+        return False
+    allowed = {a[0], a[-1]} & {b[0], b[-1]}
+    intersection = line_a.intersection(line_b)
+    if intersection.geom_type == 'Point':
+        points = [intersection]
+    elif intersection.geom_type == 'MultiPoint':
+        points = list(intersection.geoms)
+    else:
+        return True
+    return any((p.x, p.y) not in allowed for p in points)
+
+
+def uncrossarcs(arcs, tolerance, attempts=8):
+    """Simplify the arcs so that none of them cross each other.
+
+    Each arc is simplified, then any that cross themselves or another arc are
+    simplified again with half the tolerance. After a few attempts the
+    original arc is used.
+
+    Args:
+        arcs (list): arcs in their canonical direction
+        tolerance (float): simplification tolerance in map units
+        attempts (int): how many times to halve the tolerance before falling
+            back to the original arc
+
+    Returns: (dict): {arc: simplified arc}
+
+    """
+    tolerances = {a: tolerance for a in arcs}
+    simplified = {}
+
+    def resimplify(arc):
+        if tolerances[arc] is None:
+            simplified[arc] = list(arc)
+        else:
+            keep = douglaspeucker(np.array(arc), tolerances[arc])
+            simplified[arc] = [c for c, k in zip(arc, keep) if k]
+
+    for arc in arcs:
+        resimplify(arc)
+
+    index = {a: i for i, a in enumerate(arcs)}
+    bounds = np.array([
+        np.concatenate([np.min(simplified[a], axis=0),
+                        np.max(simplified[a], axis=0)])
+        for a in arcs
+    ]).reshape(-1, 4)
+
+    pending = list(arcs)
+    while pending:
+        crossed = set()
+        for arc in pending:
+            line = simplified[arc]
+            if not LineString(line).is_simple:
+                crossed.add(arc)
+            b = bounds[index[arc]]
+            nearby = np.nonzero(
+                (bounds[:, 0] <= b[2]) & (bounds[:, 2] >= b[0]) &
+                (bounds[:, 1] <= b[3]) & (bounds[:, 3] >= b[1])
+            )[0]
+            for i in nearby:
+                other = arcs[i]
+                if other != arc and _clashes(line, simplified[other]):
+                    crossed.update([arc, other])
+
+        # the original arcs can't be improved on
+        pending = [a for a in crossed if tolerances[a] is not None]
+        for arc in pending:
+            if tolerances[arc] < tolerance / 2 ** attempts:
+                tolerances[arc] = None
+            else:
+                tolerances[arc] /= 2
+            resimplify(arc)
+            bounds[index[arc]] = np.concatenate([
+                np.min(simplified[arc], axis=0),
+                np.max(simplified[arc], axis=0)
+            ])
+
+    return simplified
+
+
+def _rings(geometry):
+    """List the polygons of a geometry as lists of rings.
+    """
+    if geometry['type'] == 'Polygon':
+        return [geometry['coordinates']]
+    if geometry['type'] == 'MultiPolygon':
+        return geometry['coordinates']
+    return []
+
+
+def _isvalid(polygons):
+    """Check the rings of each polygon are long enough and form a valid
+    polygon.
+    """
+    for polygon in polygons:
+        if any(len(ring) < 4 for ring in polygon):
+            return False
+    return shape({
+        'type': 'MultiPolygon', 'coordinates': polygons
+    }).is_valid
+
+
+def simplify(polys, tolerance):
+    """Simplify the polygons, keeping the borders they share identical.
+
+    The borders have to match exactly in the input, which is the same
+    requirement that operations.findneighbours has. No simplified border
+    crosses another, and if a polygon can't be simplified into a valid
+    polygon then it keeps its original borders.
+
+    Args:
+        polys (fiona.collection.Collection): polygons to simplify
+        tolerance (float): maximum distance a removed vertex can be from the
+            simplified border, in map units
+
+    Returns: (list): features like those read by fiona, with the geometries
+        simplified. Anything that isn't a polygon is left alone.
+
+    """
+    features = [
+        {
+            'type': 'Feature',
+            'id': p.get('id'),
+            'properties': p['properties'],
+            'geometry': p['geometry'],
+        }
+        for p in polys
+    ]
+
+    # which polygons share each vertex?
+    rings = {}
+    owners = defaultdict(set)
+    for i, f in enumerate(features):
+        rings[i] = [
+            [[tuple(c[:2]) for c in ring] for ring in polygon]
+            for polygon in _rings(f['geometry'])
+        ]
+        for polygon in rings[i]:
+            for ring in polygon:
+                for c in ring:
+                    owners[c].add(i)
+
+    # split every ring into arcs
+    arcs = {
+        i: [[splitring(ring, owners) for ring in polygon]
+            for polygon in polygons]
+        for i, polygons in rings.items()
+    }
+    allarcs = sorted({
+        key for polygons in arcs.values() for polygon in polygons
+        for ring in polygon for key, _ in ring
+    })
+    simplified = uncrossarcs(allarcs, tolerance)
+
+    # any polygon that is still invalid goes back to its original arcs. That
+    # changes its neighbours too, so check them again.
+    users = defaultdict(set)
+    for i, polygons in arcs.items():
+        for polygon in polygons:
+            for ring in polygon:
+                for key, _ in ring:
+                    users[key].add(i)
+
+    output = {}
+    pending = set(arcs)
+    while pending:
+        recheck = set()
+        for i in pending:
+            output[i] = [
+                [joinarcs(ring, simplified) for ring in polygon]
+                for polygon in arcs[i]
+            ]
+            if output[i] and not _isvalid(output[i]):
+                for polygon in arcs[i]:
+                    for ring in polygon:
+                        for key, _ in ring:
+                            if simplified[key] != list(key):
+                                simplified[key] = list(key)
+                                recheck.update(users[key])
+        pending = recheck
+
+    for i, f in enumerate(features):
+        geometry = f['geometry']
+        if geometry['type'] == 'Polygon':
+            f['geometry'] = {'type': 'Polygon', 'coordinates': output[i][0]}
+        elif geometry['type'] == 'MultiPolygon':
+            f['geometry'] = {'type': 'MultiPolygon', 'coordinates': output[i]}
+
+    return features
@@ -142,12 +142,15 @@ class Hexagon(object):
 
         return list(filter(checkneighbour, neighbours))
 
-    def find_neighbour_in_direction(self, angle, sd=10):
+    def find_neighbour_in_direction(self, angle, sd=10, rng=None):
         """Find the neighbour if you take the centre of this point and draw a
         line at an angle from it
 
         Args:
             angle (float): angle in degrees
+            sd (float): standard deviation of the noise added to the angle
+            rng (numpy.random.RandomState): source of the noise, defaults to
+                the global numpy random state
 
         Returns: (tuple): grid ref of neighbour
 
@@ -173,7 +176,9 @@ class Hexagon(object):
                 [361, (0, 1)],
             ]
 
-        d = np.random.normal(0, sd)
+        if rng is None:
+            rng = np.random
+        d = rng.normal(0, sd)
 
         for a in angles:
             if (angle + d) <= a[0]:
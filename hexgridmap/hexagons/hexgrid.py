@@ -3,6 +3,8 @@
 
 import numpy as np
 import random
+import heapq
+from collections import deque
 from scipy.spatial import KDTree
 import itertools
 from . import hexagon
@@ -16,7 +18,7 @@ class Hexgrid(object):
     """
 
     def __init__(self, objects, extent, neighbours, n_x=None, n_y=None,
-                 padding=None):
+                 padding=None, schedule='random', seed=None):
         """
         Args:
             objects (dict): extracted geographic objects. Key is the code of
@@ -32,6 +34,11 @@ class Hexgrid(object):
                 Have to set this _or_ n_x.
             padding (dict): dictionary containing any padding that I want to
                 apply to the grid.
+            schedule (str): how to pick the next overlap to fix. 'random'
+                picks any of the most overlapped hexes, 'priority' fixes the
+                cheapest first without any randomness, see fitbypriority.
+            seed (int): seed for the random numbers used while fitting, so
+                that a fit can be reproduced.
 
         """
         self.objects = objects
@@ -40,6 +47,13 @@ class Hexgrid(object):
         self.n_x = n_x
         self.n_y = n_y
         self.padding = padding
+        self.schedule = schedule
+        self.occupants = None
+        self.random = random.Random(seed)
+        self.rng = np.random.RandomState(seed)
+
+        if schedule not in ('random', 'priority'):
+            raise ValueError("schedule should be 'random' or 'priority'.")
 
         # check that either x or y number of hexes is set.
         if n_x is None and n_y is None:
@@ -121,7 +135,7 @@ class Hexgrid(object):
                 # that's why add one.
             )
 
-        if self.n_y is None:
+        if self.n_x is None:
             # we need to find out how many hexagons cover the y-axis.
 
             # H is the height of one hexagon. Since the start and end hexagons
@@ -169,15 +183,24 @@ class Hexgrid(object):
                                                     self.n_y)
         self.extent['max_x'] += self.D
 
-    def fit(self):
+    def fit(self, verbose=True):
         """Assign the geographic objects to the grid, optimise their placement.
 
             First start by giving all objects an initial position close to
         their correct point.
             Then check for overlaps and points that should be neighbouring that
         aren't. Move things around as needed.
+
+        Args:
+            verbose (bool): print the progress of the fit.
         """
         self.assigninitial()
+        self.iterations = 0
+        self.moves = 0
+
+        if self.schedule == 'priority':
+            self.fitbypriority(verbose)
+            return
 
         overlaps = self.findoverlaps()
 
@@ -192,13 +215,16 @@ class Hexgrid(object):
 
 
         while getoverlapped(overlaps) > 0:
-            print(getoverlapped(overlaps))
+            if verbose:
+                print(getoverlapped(overlaps))
             gridref_tofix = self.findmostoverlapped(overlaps)
             fix = self.fixoverlap(gridref_tofix)
+            self.iterations += 1
             if fix is not None:
                 self.applychain(fix)
+                self.moves += len(fix)
                 overlaps = self.findoverlaps()
-            else:
+            elif verbose:
                 print(
                     'Failed to find a fix for this one {}'.format(
                         gridref_tofix
@@ -255,7 +281,211 @@ class Hexgrid(object):
             k for k, v in overlap.items()
             if v == max(overlap.values())
         ]
-        return random.choice(mostoverlapped)
+        return self.random.choice(sorted(mostoverlapped))
+
+    def fitbypriority(self, verbose=True):
+        """Fix the overlaps in priority order, pushing codes towards the
+        nearest empty hex.
+
+        Each overlapped hex has a priority, see priority. The hex with the
+        best priority is fixed by moving one of its codes one step closer to
+        the nearest empty hex, which pushes one of the codes there on another
+        step, and so on until the empty hex is filled. Every fix removes one
+        overlap, and there is no randomness, so the same input always gives
+        the same result.
+
+        The distances to the nearest empty hex and the priorities are updated
+        after each fix, only for the hexes that the fix affected.
+
+        Args:
+            verbose (bool): print the progress of the fit.
+        """
+        self.occupants = {gridref: [] for gridref in self.grid}
+        for code, gridref in sorted(self.assignment.items()):
+            self.occupants.setdefault(gridref, []).append(code)
+        self.distances = self.finddistancetoempty()
+
+        queue = [
+            (self.priority(gridref), gridref)
+            for gridref, codes in self.occupants.items()
+            if len(codes) > 1
+        ]
+        heapq.heapify(queue)
+        excess = sum(
+            len(codes) - 1 for codes in self.occupants.values() if codes
+        )
+
+        while queue:
+            key, gridref = heapq.heappop(queue)
+            if len(self.occupants[gridref]) < 2:
+                continue
+            current = self.priority(gridref)
+            if key != current:
+                # out of date, put it back with the current priority
+                heapq.heappush(queue, (current, gridref))
+                continue
+            if current[0] == np.inf:
+                # this is the best there is, so nothing can be fixed
+                if verbose:
+                    print('No empty hexes left to move into')
+                break
+
+            if verbose:
+                print(excess)
+            chain = self.findgradientchain(gridref)
+            moved = self.applychain(chain)
+            self.iterations += 1
+            self.moves += len(chain)
+            excess -= 1
+
+            affected = self.updatedistances(chain[-1][1])
+            affected.update(moved)
+            for code in [c for c, _ in chain]:
+                for n in self.neighbours.get(code, []):
+                    if n in self.assignment:
+                        affected.add(self.assignment[n])
+            for a in affected:
+                if len(self.occupants.get(a, [])) > 1:
+                    heapq.heappush(queue, (self.priority(a), a))
+
+    def finddistancetoempty(self):
+        """Find how many steps each hex is from the nearest empty hex.
+
+        A breadth first search across the grid, starting from every empty hex
+        at once.
+
+        Returns: (dict): {gridreference: number of steps}, infinite if there
+            are no empty hexes.
+
+        """
+        distances = {gridref: np.inf for gridref in self.grid}
+        queue = deque()
+        for gridref in sorted(self.grid):
+            if not self.occupants[gridref]:
+                distances[gridref] = 0
+                queue.append(gridref)
+        while queue:
+            gridref = queue.popleft()
+            for n in self.grid[gridref].find_neighbours():
+                if distances[n] == np.inf:
+                    distances[n] = distances[gridref] + 1
+                    queue.append(n)
+        return distances
+
+    def updatedistances(self, filled):
+        """Update the distances to the nearest empty hex after a hex is
+        filled.
+
+        Only the hexes that could have been getting their distance from the
+        filled hex are reset. They are then filled back in from the hexes
+        around them, nearest first.
+
+        Args:
+            filled (tuple): grid coordinates of the hex that was empty
+
+        Returns: (set): grid references whose distance might have changed
+
+        """
+        distances = self.distances
+        reset = {filled}
+        stack = [filled]
+        while stack:
+            gridref = stack.pop()
+            for n in self.grid[gridref].find_neighbours():
+                if n not in reset and distances[n] == distances[gridref] + 1:
+                    reset.add(n)
+                    stack.append(n)
+
+        for gridref in reset:
+            distances[gridref] = np.inf
+        queue = []
+        for gridref in reset:
+            for n in self.grid[gridref].find_neighbours():
+                if n not in reset and distances[n] < np.inf:
+                    queue.append((distances[n] + 1, gridref))
+        heapq.heapify(queue)
+        while queue:
+            d, gridref = heapq.heappop(queue)
+            if d >= distances[gridref]:
+                continue
+            distances[gridref] = d
+            for n in self.grid[gridref].find_neighbours():
+                if d + 1 < distances[n]:
+                    heapq.heappush(queue, (d + 1, n))
+        return reset
+
+    def countadjacencies(self, gridref):
+        """Count the neighbour relationships that moving things out of a hex
+        could break.
+
+        Args:
+            gridref (tuple): grid coordinates of the hex
+
+        Returns: (int): number of neighbours of the codes in this hex that are
+            assigned to this hex or one next to it.
+
+        """
+        nearby = set(self.grid[gridref].find_neighbours())
+        nearby.add(gridref)
+        return sum(
+            1
+            for code in self.occupants[gridref]
+            for n in self.neighbours.get(code, [])
+            if self.assignment.get(n) in nearby
+        )
+
+    def priority(self, gridref):
+        """How soon an overlapped hex should be fixed, lowest first.
+
+        Hexes closest to an empty hex come first, since the chain of moves
+        needed to fix them is shortest. Then the most overlapped, then the
+        ones where moving things breaks the fewest neighbour relationships.
+        Any ties are broken by the grid reference, so the order is always the
+        same.
+
+        Args:
+            gridref (tuple): grid coordinates of the hex
+
+        Returns: (tuple): the priority
+
+        """
+        return (
+            self.distances[gridref],
+            -len(self.occupants[gridref]),
+            self.countadjacencies(gridref),
+            gridref
+        )
+
+    def findgradientchain(self, gridref):
+        """Find the chain of moves that fixes an overlapped hex by walking
+        down the distances to the nearest empty hex.
+
+        At each step the hex moved into is one step closer to an empty hex,
+        and the code moved is the one lying furthest in that direction.
+
+        Args:
+            gridref (tuple): grid coordinates of the overlapped hex
+
+        Returns: (list): [(code, gridreference to move it to)]
+
+        """
+        chain = []
+        current = gridref
+        while self.distances[current] > 0:
+            centre = np.array(self.grid[current].to_geographic())
+            best = None
+            for n in self.grid[current].find_neighbours():
+                if self.distances[n] != self.distances[current] - 1:
+                    continue
+                step = np.array(self.grid[n].to_geographic()) - centre
+                for code in self.occupants[current]:
+                    offset = np.array(self.objects[code]['centroid']) - centre
+                    candidate = (-np.dot(offset, step), n, code)
+                    if best is None or candidate < best:
+                        best = candidate
+            _, current, code = best
+            chain.append((code, current))
+        return chain
 
     def fixoverlap(self, gridref):
         """Find a reassignment for a code at hex gridref.
@@ -319,7 +549,9 @@ class Hexgrid(object):
                         findswap(
                             a['code'],
                             nextgridref,
-                            hexagon.find_neighbour_in_direction(a['angle']),
+                            hexagon.find_neighbour_in_direction(
+                                a['angle'], rng=self.rng
+                            ),
                             newswaps,
                             alreadymoved
                         )
@@ -343,7 +575,9 @@ class Hexgrid(object):
         angle_to_move = operations.anglebetween(gridref_hex.to_geographic(), self.objects[startcode]['centroid'])
 
         # Which hex is that?
-        grid_to_move_to = gridref_hex.find_neighbour_in_direction(angle_to_move)
+        grid_to_move_to = gridref_hex.find_neighbour_in_direction(
+            angle_to_move, rng=self.rng
+        )
         swaps = []
         alreadymoved = []
         chains = findswap(
@@ -361,6 +595,15 @@ class Hexgrid(object):
         Args:
             chain (list): list of swaps from above
 
+        Returns: (set): grid references that codes moved out of or into
+
         """
+        moved = set()
         for swap in chain:
+            previous = self.assignment[swap[0]]
             self.assignment[swap[0]] = swap[1]
+            moved.update([previous, swap[1]])
+            if self.occupants is not None:
+                self.occupants[previous].remove(swap[0])
+                self.occupants.setdefault(swap[1], []).append(swap[0])
+        return moved
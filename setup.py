@@ -1,9 +1,14 @@
-from distutils.core import setup
+from setuptools import setup
 
 setup(
     name='hexgridmap',
     version='0.1dev',
-    packages=['hexgridmap',],
+    packages=['hexgridmap', 'hexgridmap.geo', 'hexgridmap.hexagons'],
     license='GNU general public licence',
     long_description=open('README.md').read(),
+    entry_points={
+        'console_scripts': [
+            'hexgridmap = hexgridmap.cli:main',
+        ],
+    },
 )
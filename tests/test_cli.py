@@ -0,0 +1,83 @@
+import argparse
+import os
+import pytest
+from hexgridmap import cli
+
+
+def test_parsemapping():
+    assert cli.parsemapping(['name=lau118nm', 'e=bng_e']) == {
+        'name': 'lau118nm', 'e': 'bng_e',
+    }
+    assert cli.parsemapping(['max_x=50e3'], float) == {'max_x': 50e3}
+
+
+def test_parsemapping_keeps_equals_in_value():
+    assert cli.parsemapping(['a=b=c']) == {'a': 'b=c'}
+
+
+def test_parsemapping_rejects_missing_equals():
+    with pytest.raises(argparse.ArgumentTypeError):
+        cli.parsemapping(['lau118nm'])
+
+
+def test_parseargs_defaults_to_lau_schema():
+    options = cli.parseargs(['a.shp'])
+    assert options.code_field == 'lau118cd'
+    assert options.fields == {
+        'name': 'lau118nm', 'e': 'bng_e', 'n': 'bng_n',
+    }
+    assert options.padding == {'max_x': 50e3}
+    assert options.n_x == 36
+    assert options.n_y is None
+    assert options.extract_workers == options.workers
+
+
+def test_parseargs_overrides_defaults():
+    options = cli.parseargs([
+        'a.shp', '--field', 'name=nm', '--padding', 'min_y=-1e3',
+        '--n-y', '10',
+    ])
+    assert options.fields == {'name': 'nm'}
+    assert options.padding == {'min_y': -1e3}
+    assert options.n_x is None
+    assert options.n_y == 10
+
+
+@pytest.mark.parametrize('argv', [
+    ['a.shp', '--field', 'nm'],
+    ['a.shp', '--trim', '50'],
+    ['a.shp', '--trim', '-1'],
+    ['a.shp', '--n-x', '10', '--n-y', '10'],
+])
+def test_parseargs_rejects_bad_options(argv):
+    with pytest.raises(SystemExit):
+        cli.parseargs(argv)
+
+
+def test_outputpaths():
+    assert cli.outputpaths(['eng/lau.shp', 'sco/ward.shp'], 'out') == {
+        'eng/lau.shp': os.path.join('out', 'lau.json'),
+        'sco/ward.shp': os.path.join('out', 'ward.json'),
+    }
+
+
+def test_outputpaths_rejects_clashing_stems():
+    with pytest.raises(ValueError) as e:
+        cli.outputpaths(['eng/lau.shp', 'sco/lau.shp'], 'out')
+    assert 'eng/lau.shp' in str(e.value)
+    assert 'sco/lau.shp' in str(e.value)
+
+
+def test_expandinputs_deduplicates(tmp_path):
+    for name in ['a.shp', 'b.shp', 'c.dbf']:
+        (tmp_path / name).write_text('')
+    a = str(tmp_path / 'a.shp')
+    b = str(tmp_path / 'b.shp')
+    assert cli.expandinputs(
+        [str(tmp_path / '*.shp'), a, str(tmp_path / 'a.*')]
+    ) == [a, b]
+
+
+def test_expandinputs_keeps_missing_paths():
+    assert cli.expandinputs(['missing.shp']) == ['missing.shp']
+    assert cli.expandinputs(['missing/*.shp']) == []
@@ -0,0 +1,60 @@
+import random
+from hexgridmap.hexagons import hexgrid
+
+
+def clustered(n=60):
+    """Objects bunched around a few points, so that plenty of them start off
+    on the same hex.
+    """
+    r = random.Random(0)
+    centres = [(r.uniform(1e4, 9e4), r.uniform(1e4, 9e4)) for _ in range(3)]
+    objects = {}
+    for i in range(n):
+        cx, cy = r.choice(centres)
+        objects['c%02d' % i] = {
+            'centroid': (r.gauss(cx, 5e3), r.gauss(cy, 5e3))
+        }
+    codes = sorted(objects)
+    neighbours = {c: [codes[i - 1]] for i, c in enumerate(codes)}
+    return objects, neighbours
+
+
+def fit(n_x=12, **kwargs):
+    objects, neighbours = clustered()
+    extent = {'min_x': 0, 'min_y': 0, 'max_x': 1e5, 'max_y': 1e5}
+    h = hexgrid.Hexgrid(objects, extent, neighbours, n_x=n_x, **kwargs)
+    h.fit(verbose=False)
+    return h
+
+
+def test_priority_removes_all_overlaps():
+    h = fit(schedule='priority')
+    assert len(set(h.assignment.values())) == len(h.objects)
+    assert all(g in h.grid for g in h.assignment.values())
+
+
+def test_priority_fixes_one_overlap_per_iteration():
+    h = fit(schedule='priority')
+    h.assigninitial()
+    overlaps = h.findoverlaps()
+    assert h.iterations == sum(v - 1 for v in overlaps.values())
+
+
+def test_priority_is_deterministic_without_a_seed():
+    assert fit(schedule='priority').assignment == \
+        fit(schedule='priority').assignment
+
+
+def test_random_is_reproducible_with_a_seed():
+    assert fit(n_x=20, seed=2).assignment == fit(n_x=20, seed=2).assignment
+
+
+def test_grid_from_n_y():
+    objects, neighbours = clustered()
+    extent = {'min_x': 0, 'min_y': 0, 'max_x': 1e5, 'max_y': 1e5}
+    h = hexgrid.Hexgrid(objects, extent, neighbours, n_y=10)
+    assert h.n_y == 10
+    assert h.n_x % 2 == 0
+    assert len(h.grid) == h.n_x * h.n_y
+    # the hexes at either end of the y axis are centred on the extent
+    assert h.H * (h.n_y - 1) == 1e5
@@ -0,0 +1,183 @@
+import fiona
+import numpy as np
+import pytest
+from shapely.geometry import shape
+from hexgridmap.geo import operations
+
+
+def feature(geometry, code=None):
+    return {'properties': {'code': code}, 'geometry': geometry}
+
+
+GEOMETRIES = [
+    {'type': 'Polygon', 'coordinates': [
+        [(0, 0), (4, 0), (4, 3), (0, 0)],
+        [(1, 0.5), (3, 0.5), (3, 1), (1, 0.5)],
+    ]},
+    {'type': 'MultiPolygon', 'coordinates': [
+        [[(10, 10), (12, 10), (12, 11), (10, 10)]],
+        [[(-5, 2), (-4, 2), (-4, 8), (-5, 2)]],
+    ]},
+    {'type': 'Polygon', 'coordinates': [
+        [(1, -2, 100), (2, -2, 100), (2, -1, 50), (1, -2, 100)],
+    ]},
+    {'type': 'Point', 'coordinates': (7, 20)},
+    {'type': 'GeometryCollection', 'geometries': [
+        {'type': 'Point', 'coordinates': (3, 3)},
+        {'type': 'LineString', 'coordinates': [(20, 1), (21, 5)]},
+    ]},
+]
+
+
+class Collection(list):
+
+    """A list of features with bounds metadata, like a fiona collection.
+    """
+
+    bounds = (-100, -200, 300, 400)
+
+
+@pytest.mark.parametrize('geometry', GEOMETRIES)
+def test_geometrybounds_matches_shapely(geometry):
+    assert operations.geometrybounds(geometry) == \
+        pytest.approx(shape(geometry).bounds)
+
+
+def test_iterrings_drops_z():
+    rings = list(operations.iterrings(GEOMETRIES[2]['coordinates']))
+    assert len(rings) == 1
+    assert rings[0].shape == (4, 2)
+
+
+def test_findextent_streams_coordinates():
+    polys = [feature(g) for g in GEOMETRIES]
+    assert operations.findextent(polys) == {
+        'min_x': -5, 'min_y': -2, 'max_x': 21, 'max_y': 20,
+    }
+
+
+def test_findextent_uses_collection_bounds():
+    polys = Collection(feature(g) for g in GEOMETRIES)
+    assert operations.findextent(polys) == {
+        'min_x': -100, 'min_y': -200, 'max_x': 300, 'max_y': 400,
+    }
+
+
+def test_findextent_trim():
+    # squares one unit across, along the diagonal, with an outlier
+    polys = [
+        feature({'type': 'Polygon', 'coordinates': [
+            [(i, i), (i + 1, i), (i + 1, i + 1), (i, i + 1), (i, i)]
+        ]})
+        for i in list(range(10)) + [1000]
+    ]
+    mins = np.array(list(range(10)) + [1000])
+    extent = operations.findextent(Collection(polys), trim=10)
+    assert extent == {
+        'min_x': pytest.approx(np.percentile(mins, 10)),
+        'min_y': pytest.approx(np.percentile(mins, 10)),
+        'max_x': pytest.approx(np.percentile(mins + 1, 90)),
+        'max_y': pytest.approx(np.percentile(mins + 1, 90)),
+    }
+    assert extent['max_x'] < 1000
+    assert operations.findextent(polys, trim=0) == \
+        operations.findextent(polys)
+
+
+@pytest.mark.parametrize('trim', [-1, 50, 60])
+def test_findextent_rejects_bad_trim(trim):
+    with pytest.raises(ValueError):
+        operations.findextent([feature(GEOMETRIES[0])], trim=trim)
+
+
+def codeextractor(x):
+    return x['properties']['code']
+
+
+def writegrid(path, n=6):
+    """Write a shapefile of n x n unit squares.
+    """
+    schema = {
+        'geometry': 'Polygon',
+        'properties': {'code': 'str', 'name': 'str'},
+    }
+    with fiona.open(str(path), 'w', driver='ESRI Shapefile',
+                    schema=schema) as f:
+        for i in range(n):
+            for j in range(n):
+                f.write({
+                    'geometry': {'type': 'Polygon', 'coordinates': [
+                        [(i, j), (i + 1, j), (i + 1, j + 2), (i, j)]
+                    ]},
+                    'properties': {
+                        'code': '{}_{}'.format(i, j),
+                        'name': 'n{}'.format(i * n + j),
+                    },
+                })
+
+
+def test_extractcentroids_pool_matches_serial(tmp_path):
+    path = tmp_path / 'grid.shp'
+    writegrid(path)
+    fields = {'name': 'name'}
+    with fiona.open(str(path)) as polys:
+        serial = operations.extractcentroids(
+            polys, codeextractor, fields, representative=True, processes=1
+        )
+        pooled = operations.extractcentroids(
+            polys, codeextractor, fields, representative=True, processes=3,
+            chunksize=7
+        )
+    assert len(serial['code']) == 36
+    assert pooled['code'] == serial['code']
+    assert pooled['name'] == serial['name']
+    np.testing.assert_allclose(pooled['centroid'], serial['centroid'])
+    np.testing.assert_allclose(pooled['representative_point'],
+                               serial['representative_point'])
+
+
+def test_extractcentroids_pool_of_features_matches_serial():
+    polys = [
+        feature({'type': 'Polygon', 'coordinates': [
+            [(i, 0), (i + 1, 0), (i + 1, 3), (i, 0)]
+        ]}, code=str(i))
+        for i in range(20)
+    ]
+    serial = operations.extractcentroids(polys, codeextractor, processes=1)
+    pooled = operations.extractcentroids(polys, codeextractor, processes=2,
+                                         chunksize=6)
+    assert pooled['code'] == serial['code']
+    np.testing.assert_allclose(pooled['centroid'], serial['centroid'])
+    np.testing.assert_allclose(serial['centroid'][3], (3 + 2 / 3, 1))
+
+
+def test_extractcentroids_empty():
+    columns = operations.extractcentroids([], codeextractor,
+                                          representative=True)
+    assert columns['code'] == []
+    assert columns['centroid'].shape == (0, 2)
+    assert columns['representative_point'].shape == (0, 2)
+
+
+def test_columnstoobjects():
+    columns = {
+        'code': ['a', 'b'],
+        'name': ['A', 'B'],
+        'centroid': np.array([[0.0, 1.0], [2.0, 3.0]]),
+        'representative_point': np.array([[5.0, 6.0], [7.0, 8.0]]),
+    }
+    assert operations.columnstoobjects(columns) == {
+        'a': {'name': 'A', 'centroid': (0.0, 1.0)},
+        'b': {'name': 'B', 'centroid': (2.0, 3.0)},
+    }
+    assert operations.columnstoobjects(
+        columns, 'representative_point'
+    )['b'] == {'name': 'B', 'centroid': (7.0, 8.0)}
+
+
+def test_columnstoobjects_missing_representative_point():
+    columns = operations.extractcentroids(
+        [feature(GEOMETRIES[0], code='a')], codeextractor
+    )
+    with pytest.raises(ValueError):
+        operations.columnstoobjects(columns, 'representative_point')
@@ -0,0 +1,72 @@
+import math
+from shapely.geometry import shape
+from hexgridmap.geo import operations, simplify
+
+
+def feature(code, ring):
+    return {
+        'id': code,
+        'properties': {'code': code},
+        'geometry': {'type': 'Polygon', 'coordinates': [ring]},
+    }
+
+
+def stackedpolygons():
+    """Three polygons stacked on top of each other. The A|B border has a
+    spike that survives simplification, the B|C border is a gentle bow that
+    gets flattened onto the spike.
+    """
+    ab = [(0.0, 85.0), (90.0, 85.0), (100.0, 110.0), (110.0, 85.0),
+          (200.0, 85.0)]
+    bc = [
+        (float(x), 100 + 15 * math.sin(math.pi * x / 200))
+        for x in range(0, 201, 10)
+    ]
+    a = [(0.0, 0.0), (200.0, 0.0)] + ab[::-1] + [(0.0, 0.0)]
+    b = ab + bc[::-1] + [ab[0]]
+    c = bc + [(200.0, 200.0), (0.0, 200.0), bc[0]]
+    return [feature('A', a), feature('B', b), feature('C', c)]
+
+
+def codeextractor(x):
+    return x['properties']['code']
+
+
+def test_input_is_valid():
+    polys = stackedpolygons()
+    assert all(shape(p['geometry']).is_valid for p in polys)
+    assert operations.findneighbours(polys, codeextractor) == {
+        'A': ['B'], 'B': ['A', 'C'], 'C': ['B'],
+    }
+
+
+def test_simplify_keeps_polygons_valid():
+    output = simplify.simplify(stackedpolygons(), 20)
+    assert all(shape(p['geometry']).is_valid for p in output)
+
+
+def test_simplify_keeps_neighbours():
+    output = simplify.simplify(stackedpolygons(), 20)
+    assert operations.findneighbours(output, codeextractor) == {
+        'A': ['B'], 'B': ['A', 'C'], 'C': ['B'],
+    }
+
+
+def test_simplify_removes_vertices():
+    polys = stackedpolygons()
+    output = simplify.simplify(polys, 1)
+    before = sum(len(p['geometry']['coordinates'][0]) for p in polys)
+    after = sum(len(p['geometry']['coordinates'][0]) for p in output)
+    assert after < before
+
+
+def test_shared_borders_match():
+    output = simplify.simplify(stackedpolygons(), 20)
+    b = set(output[1]['geometry']['coordinates'][0])
+    c = set(output[2]['geometry']['coordinates'][0])
+    border = shape(output[1]['geometry']).intersection(
+        shape(output[2]['geometry'])
+    )
+    lines = getattr(border, 'geoms', [border])
+    assert border.length > 0
+    assert {xy for line in lines for xy in line.coords} <= b & c